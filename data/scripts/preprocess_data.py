@@ -1,14 +1,23 @@
 import pandas as pd
 import numpy as np
 import boto3
-from sklearn.preprocessing import LabelEncoder, StandardScaler
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.fs as pafs
+from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
 import io
 import sys
 
 def main():
-    # S3 client
+    # S3 clients
     s3 = boto3.client('s3')
+    region = boto3.Session().region_name
+    s3fs = pafs.S3FileSystem(region=region)
     
     # Get bucket names from command line
     raw_bucket = sys.argv[1]
@@ -16,6 +25,40 @@ def main():
     
     print("Starting data preprocessing...")
     
+    # Processed outputs; the cache copy of feature_info.json is written last and marks a complete entry
+    processed_keys = [
+        'train/train.csv', 'validation/validation.csv', 'test/test.csv.gz',
+        'categorical_mappings.json', 'feature_info.json'
+    ]
+    
+    # Key the cache on the raw object ETags and this script, so data or code changes invalidate it
+    train_etag = s3.head_object(Bucket=raw_bucket, Key='KDDTrain+.txt')['ETag']
+    test_etag = s3.head_object(Bucket=raw_bucket, Key='KDDTest+.txt')['ETag']
+    with open(__file__, 'rb') as f:
+        script_source = f.read()
+    cache_hash = hashlib.sha256((train_etag + test_etag).encode() + script_source).hexdigest()
+    cache_prefix = f'cache/{cache_hash}'
+    
+    try:
+        s3.head_object(Bucket=processed_bucket, Key=f'{cache_prefix}/feature_info.json')
+        cache_hit = True
+    except ClientError as e:
+        # Only a missing object is a miss; anything else (e.g. AccessDenied) is a real error
+        if e.response['Error']['Code'] not in ('404', 'NoSuchKey', 'NotFound'):
+            raise
+        cache_hit = False
+    
+    if cache_hit:
+        print("Raw data unchanged since the last run, restoring cached processed data...")
+        for key in processed_keys:
+            s3.copy_object(
+                Bucket=processed_bucket,
+                Key=key,
+                CopySource={'Bucket': processed_bucket, 'Key': f'{cache_prefix}/{key}'}
+            )
+        print("Data preprocessing completed successfully (from cache)!")
+        return
+    
     # Column names for NSL-KDD dataset
     columns = [
         'duration', 'protocol_type', 'service', 'flag', 'src_bytes', 'dst_bytes',
@@ -30,20 +73,38 @@ def main():
         'dst_host_rerror_rate', 'dst_host_srv_rerror_rate', 'label', 'difficulty'
     ]
     
-    # Download and load data from S3
-    print("Loading training data...")
-    train_obj = s3.get_object(Bucket=raw_bucket, Key='KDDTrain+.txt')
-    train_data = pd.read_csv(io.BytesIO(train_obj['Body'].read()), names=columns)
+    # Download data from S3 and parse it with the multithreaded pyarrow CSV reader
+    read_options = pacsv.ReadOptions(column_names=columns)
+    parse_options = pacsv.ParseOptions(delimiter=',')
+    
+    # Large objects are fetched as parallel ranged GETs instead of one sequential stream
+    transfer_config = TransferConfig(
+        multipart_threshold=8 * 1024 * 1024,
+        multipart_chunksize=8 * 1024 * 1024,
+        max_concurrency=8,
+        use_threads=True
+    )
     
-    print("Loading test data...")
-    test_obj = s3.get_object(Bucket=raw_bucket, Key='KDDTest+.txt')
-    test_data = pd.read_csv(io.BytesIO(test_obj['Body'].read()), names=columns)
+    def load_csv(key):
+        buffer = io.BytesIO()
+        s3.download_fileobj(raw_bucket, key, buffer, Config=transfer_config)
+        buffer.seek(0)
+        table = pacsv.read_csv(buffer, read_options=read_options, parse_options=parse_options)
+        return table.to_pandas(types_mapper=pd.ArrowDtype)
+    
+    # Fetch both files concurrently so download time is the slower of the two, not the sum
+    print("Loading training and test data...")
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        train_future = executor.submit(load_csv, 'KDDTrain+.txt')
+        test_future = executor.submit(load_csv, 'KDDTest+.txt')
+        train_data = train_future.result()
+        test_data = test_future.result()
     
     print(f"Training data shape: {train_data.shape}")
     print(f"Test data shape: {test_data.shape}")
     
-    # Preprocessing function
-    def preprocess_data(df):
+    # Preprocessing function; fits the encoders and scaler unless fitted ones are passed in
+    def preprocess_data(df, scaler=None, cat_maps=None):
         df = df.copy()
         
         # Remove difficulty column
@@ -51,59 +112,88 @@ def main():
             df = df.drop('difficulty', axis=1)
         
         # Convert label to binary (0: normal, 1: attack)
-        df['label'] = df['label'].apply(lambda x: 0 if x == 'normal' else 1)
+        df['label'] = (df['label'].to_numpy() != 'normal').astype(np.int8)
         
-        # Encode categorical features
+        # Encode categorical features (unseen categories map to -1)
         categorical_features = ['protocol_type', 'service', 'flag']
+        binary_features = ['land', 'logged_in', 'root_shell', 'su_attempted', 'is_host_login', 'is_guest_login']
+        fit_categories = cat_maps is None
+        if fit_categories:
+            cat_maps = {}
         
         for feature in categorical_features:
-            le = LabelEncoder()
-            df[feature] = le.fit_transform(df[feature])
+            if fit_categories:
+                categorical = pd.Categorical(df[feature])
+                cat_maps[feature] = categorical.categories.tolist()
+            else:
+                categorical = pd.Categorical(df[feature], categories=cat_maps[feature])
+            df[feature] = categorical.codes
         
         # Separate features and target
         X = df.drop('label', axis=1)
         y = df['label']
         
-        # Normalize continuous features
-        scaler = StandardScaler()
-        X_scaled = pd.DataFrame(scaler.fit_transform(X), columns=X.columns)
+        # Discrete columns stay unscaled int8 (tree splits are scale-invariant); only
+        # continuous columns go through the scaler
+        discrete_features = categorical_features + binary_features
+        continuous_features = [c for c in X.columns if c not in discrete_features]
+        X_continuous = X[continuous_features].astype(np.float32)
+        
+        # Normalize continuous features (float32 is ample precision for tree splits)
+        if scaler is None:
+            scaler = StandardScaler()
+            X_continuous = scaler.fit_transform(X_continuous)
+        else:
+            X_continuous = scaler.transform(X_continuous)
+        X_continuous = X_continuous.astype(np.float32, copy=False)
         
-        return X_scaled, y, scaler
+        # Reassemble in the original column order
+        continuous_index = {c: i for i, c in enumerate(continuous_features)}
+        X_scaled = pd.DataFrame({
+            c: X_continuous[:, continuous_index[c]] if c in continuous_index else X[c].to_numpy(np.int8)
+            for c in X.columns
+        })
+        
+        return X_scaled, y, scaler, cat_maps
     
     # Preprocess data
     print("Preprocessing training data...")
-    X_train, y_train, scaler = preprocess_data(train_data)
-    
-    print("Preprocessing test data...")
-    X_test, y_test, _ = preprocess_data(test_data)
+    X_train, y_train, scaler, cat_maps = preprocess_data(train_data)
     
-    # Prepare data for XGBoost (target as first column)
-    train_data_xgb = pd.concat([y_train, X_train], axis=1)
-    test_data_xgb = pd.concat([y_test, X_test], axis=1)
+    print("Preprocessing test data with the training encoders and scaler...")
+    X_test, y_test, _, _ = preprocess_data(test_data, scaler=scaler, cat_maps=cat_maps)
     
     # Create validation split
     X_train_split, X_val, y_train_split, y_val = train_test_split(
         X_train, y_train, test_size=0.2, random_state=42, stratify=y_train
     )
     
-    train_split_xgb = pd.concat([y_train_split, X_train_split], axis=1)
-    val_data_xgb = pd.concat([y_val, X_val], axis=1)
+    # Prepare data for XGBoost (target as first column); the columns keep their own dtypes
+    # so integer columns are written without decimals
+    def to_xgb_table(X, y):
+        columns = {'label': y.to_numpy(np.int8)}
+        columns.update((c, X[c].to_numpy()) for c in X.columns)
+        return pa.table(columns)
+    
+    train_split_xgb = to_xgb_table(X_train_split, y_train_split)
+    val_data_xgb = to_xgb_table(X_val, y_val)
+    test_data_xgb = to_xgb_table(X_test, y_test)
+    
+    # Stream headerless CSV straight to S3 without building an in-memory string
+    def upload_csv(table, key, compression=None):
+        with s3fs.open_output_stream(f'{processed_bucket}/{key}', compression=compression) as out:
+            pacsv.write_csv(table, out, write_options=pacsv.WriteOptions(include_header=False))
     
     # Upload processed data to S3
     print("Uploading processed training data...")
-    csv_buffer = io.StringIO()
-    train_split_xgb.to_csv(csv_buffer, index=False, header=False)
-    s3.put_object(Bucket=processed_bucket, Key='train/train.csv', Body=csv_buffer.getvalue())
+    upload_csv(train_split_xgb, 'train/train.csv')
     
     print("Uploading processed validation data...")
-    csv_buffer = io.StringIO()
-    val_data_xgb.to_csv(csv_buffer, index=False, header=False)
-    s3.put_object(Bucket=processed_bucket, Key='validation/validation.csv', Body=csv_buffer.getvalue())
+    upload_csv(val_data_xgb, 'validation/validation.csv')
     
     print("Uploading processed test data...")
-    csv_buffer = io.StringIO()
-    test_data_xgb.to_csv(csv_buffer, index=False, header=False)
-    s3.put_object(Bucket=processed_bucket, Key='test/test.csv', Body=csv_buffer.getvalue())
+    # The test split is not a training channel, so it can be stored gzipped
+    upload_csv(test_data_xgb, 'test/test.csv.gz', compression='gzip')
     
     # Save feature information
     feature_info = {
@@ -118,10 +208,39 @@ def main():
         Body=json.dumps(feature_info)
     )
     
+    # Save categorical code mappings so inference can encode inputs identically
+    s3.put_object(
+        Bucket=processed_bucket, 
+        Key='categorical_mappings.json', 
+        Body=json.dumps(cat_maps)
+    )
+    
+    # Store a copy under the cache prefix so unchanged inputs skip preprocessing next time
+    print("Caching processed data...")
+    for key in processed_keys:
+        s3.copy_object(
+            Bucket=processed_bucket,
+            Key=f'{cache_prefix}/{key}',
+            CopySource={'Bucket': processed_bucket, 'Key': key}
+        )
+    
+    # Drop cache entries left by earlier inputs or script versions; only the current one is kept
+    paginator = s3.get_paginator('list_objects_v2')
+    stale_keys = [
+        {'Key': obj['Key']}
+        for page in paginator.paginate(Bucket=processed_bucket, Prefix='cache/')
+        for obj in page.get('Contents', [])
+        if not obj['Key'].startswith(f'{cache_prefix}/')
+    ]
+    for i in range(0, len(stale_keys), 1000):
+        s3.delete_objects(Bucket=processed_bucket, Delete={'Objects': stale_keys[i:i + 1000]})
+    if stale_keys:
+        print(f"Removed {len(stale_keys)} stale cache objects")
+    
     print("Data preprocessing completed successfully!")
     print(f"Training data: s3://{processed_bucket}/train/train.csv")
     print(f"Validation data: s3://{processed_bucket}/validation/validation.csv")
-    print(f"Test data: s3://{processed_bucket}/test/test.csv")
+    print(f"Test data: s3://{processed_bucket}/test/test.csv.gz")
 
 if __name__ == "__main__":
     main()
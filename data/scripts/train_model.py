@@ -2,6 +2,8 @@ import boto3
 import sagemaker
 from sagemaker.xgboost.estimator import XGBoost
 from sagemaker.inputs import TrainingInput
+from sagemaker.serverless import ServerlessInferenceConfig
+import os
 import sys
 
 def main():
@@ -24,7 +26,7 @@ def main():
     print(f"Model output: {output_path}")
     
     # Get XGBoost container
-    container = sagemaker.image_uris.retrieve('xgboost', region, version='1.5-1')
+    container = sagemaker.image_uris.retrieve('xgboost', region, version='1.7-1')
     
     # Create XGBoost estimator
     xgb_estimator = XGBoost(
@@ -36,10 +38,12 @@ def main():
         sagemaker_session=sess,
         hyperparameters={
             'objective': 'binary:logistic',
+            'tree_method': 'hist',
+            'max_bin': 256,
             'eval_metric': 'auc',
-            'num_round': 100,
+            'num_round': 200,
             'max_depth': 6,
-            'eta': 0.1,
+            'eta': 0.3,
             'subsample': 0.8,
             'colsample_bytree': 0.8,
             'min_child_weight': 3,
@@ -47,14 +51,14 @@ def main():
             'reg_alpha': 0.1,
             'reg_lambda': 1,
             'scale_pos_weight': 1,
-            'early_stopping_rounds': 10,
+            'early_stopping_rounds': 15,
             'verbosity': 1
         }
     )
     
     # Define training inputs
-    train_input = TrainingInput(train_path, content_type='text/csv')
-    validation_input = TrainingInput(validation_path, content_type='text/csv')
+    train_input = TrainingInput(train_path, content_type='text/csv', input_mode='FastFile')
+    validation_input = TrainingInput(validation_path, content_type='text/csv', input_mode='FastFile')
     
     # Start training
     print("Starting model training job...")
@@ -63,11 +67,14 @@ def main():
         'validation': validation_input
     })
     
-    # Deploy model
-    print("Deploying model to endpoint...")
+    # Deploy model to a serverless endpoint (scales to zero unless warm capacity is opted into)
+    print("Deploying model to serverless endpoint...")
+    serverless_config = {'memory_size_in_mb': 1024, 'max_concurrency': 5}
+    provisioned = int(os.environ.get('PROVISIONED_CONCURRENCY', '0'))
+    if provisioned > 0:
+        serverless_config['provisioned_concurrency'] = provisioned  # Billed around the clock
     predictor = xgb_estimator.deploy(
-        initial_instance_count=1,
-        instance_type='ml.t2.medium',
+        serverless_inference_config=ServerlessInferenceConfig(**serverless_config),
         endpoint_name='threat-detection-endpoint'
     )
     
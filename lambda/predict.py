@@ -1,67 +1,156 @@
 import json
+import math
+import struct
 import boto3
 import os
 
+# Created once per container so warm invocations reuse the client and its connections
+sagemaker_runtime = boto3.client('sagemaker-runtime')
+
+# Get endpoint name from environment variable with fallback
+endpoint_name = os.environ.get('ENDPOINT_NAME', 'threat-detection-endpoint-1761182339')
+
+# Expected feature count per row (set by Terraform); malformed rows fail before the endpoint call
+expected_features = int(os.environ['NUM_FEATURES']) if os.environ.get('NUM_FEATURES') else None
+
+# Drops JSON-style brackets and turns line breaks into separators in one pass over the response
+response_table = str.maketrans('\n', ',', '[]')
+
+cors_headers = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Headers': 'Content-Type',
+    'Access-Control-Allow-Methods': 'POST, OPTIONS'
+}
+
+class BadRequestError(ValueError):
+    """Raised for malformed request input; reported to the caller as HTTP 400"""
+
+def to_float32(values):
+    # Round through float32 so comparisons match XGBoost's own split decisions exactly
+    return struct.unpack(f'{len(values)}f', struct.pack(f'{len(values)}f', *map(float, values)))
+
+# XGBoost trees bundled by automated_training.py. They are only used while ENDPOINT_NAME
+# still names the deployment they were exported from; after any redeploy that only updates
+# ENDPOINT_NAME, requests go back to the endpoint instead of serving stale trees
+model_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'xgboost_model.json')
+local_model = None
+if os.path.exists(model_path):
+    with open(model_path) as f:
+        local_model = json.load(f)
+    if local_model.get('endpoint_name') != endpoint_name:
+        print(f"Bundled model is for {local_model.get('endpoint_name')}, not {endpoint_name}; using the endpoint")
+        local_model = None
+
+if local_model is not None:
+    # The model's own feature count takes precedence over NUM_FEATURES
+    expected_features = local_model['num_feature']
+    base_score = local_model['base_score']
+    base_margin = math.log(base_score / (1 - base_score))
+    trees = [
+        (tree['feature'], to_float32(tree['threshold']), tree['left'], tree['right'], tree['missing'], tree['value'])
+        for tree in local_model['trees']
+    ]
+
+def predict_local(rows):
+    predictions = []
+    for row in rows:
+        # XGBoost compares features in float32; rows have been checked against num_feature
+        values = to_float32(row)
+        
+        margin = base_margin
+        for feature, threshold, left, right, missing, value in trees:
+            node = 0
+            while left[node] != -1:
+                x = values[feature[node]]
+                if x != x:
+                    node = missing[node]
+                elif x < threshold[node]:
+                    node = left[node]
+                else:
+                    node = right[node]
+            margin += value[node]
+        
+        predictions.append(1 / (1 + math.exp(-margin)))
+    return predictions
+
+def format_prediction(prediction):
+    # Convert to binary classification (0: normal, 1: attack)
+    threat_detected = 1 if prediction > 0.5 else 0
+    confidence = prediction if threat_detected else 1 - prediction
+    
+    return {
+        'prediction': threat_detected,
+        'confidence': round(confidence, 4),
+        'status': 'Attack Detected' if threat_detected else 'Normal Traffic',
+        'raw_score': round(prediction, 4)
+    }
+
 def lambda_handler(event, context):
     try:
         # Parse the request body
         body = json.loads(event['body'])
         features = body['features']
         
-        # Initialize SageMaker clients
-        sagemaker_runtime = boto3.client('sagemaker-runtime')
-        sagemaker = boto3.client('sagemaker')
-        
-        # Get endpoint name from environment variable with fallback
-        endpoint_name = os.environ.get('ENDPOINT_NAME', 'threat-detection-endpoint-1761182339')
-        
-        # Prepare the input data (convert to CSV format for XGBoost)
-        csv_input = ','.join(map(str, features))
+        # Accept either a single feature vector or a list of them (batched)
+        if not isinstance(features, list) or not features:
+            raise BadRequestError('features must be a non-empty list of numbers or of feature rows')
+        is_batch = isinstance(features[0], list)
+        rows = features if is_batch else [features]
         
-        # Invoke the SageMaker endpoint
-        response = sagemaker_runtime.invoke_endpoint(
-            EndpointName=endpoint_name,
-            ContentType='text/csv',
-            Body=csv_input
-        )
+        for row in rows:
+            if not isinstance(row, list) or not row:
+                raise BadRequestError('Each feature row must be a non-empty list of numbers')
+            if any(isinstance(value, bool) or not isinstance(value, (int, float)) for value in row):
+                raise BadRequestError('Feature values must be numbers')
         
-        # Parse the prediction result
-        result = response['Body'].read().decode().strip()
+        if expected_features is not None:
+            for row in rows:
+                if len(row) != expected_features:
+                    raise BadRequestError(f'Expected {expected_features} features per row, got {len(row)}')
         
-        # Handle different response formats
-        if result.startswith('[') and result.endswith(']'):
-            # Remove brackets and get the number
-            prediction = float(result.strip('[]'))
+        if local_model is not None:
+            predictions = predict_local(rows)
         else:
-            prediction = float(result)
+            # Prepare the input data (one CSV line per row for XGBoost), already encoded
+            # so boto3 sends the bytes as-is
+            csv_input = '\n'.join(','.join(map(str, row)) for row in rows).encode()
+            
+            # Invoke the SageMaker endpoint once for all rows
+            response = sagemaker_runtime.invoke_endpoint(
+                EndpointName=endpoint_name,
+                ContentType='text/csv',
+                Body=csv_input
+            )
+            
+            # Parse the prediction results; handles plain scores, bracketed lists and one score per line
+            result = response['Body'].read().decode().translate(response_table)
+            predictions = [float(value) for value in result.split(',') if value.strip()]
         
-        # Convert to binary classification (0: normal, 1: attack)
-        threat_detected = 1 if prediction > 0.5 else 0
-        confidence = prediction if threat_detected else 1 - prediction
+        if len(predictions) != len(rows):
+            raise RuntimeError(f'Model returned {len(predictions)} scores for {len(rows)} rows')
+        
+        results = [format_prediction(prediction) for prediction in predictions]
         
         return {
             'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Headers': 'Content-Type',
-                'Access-Control-Allow-Methods': 'POST, OPTIONS'
-            },
+            'headers': cors_headers,
+            'body': json.dumps({'predictions': results} if is_batch else results[0])
+        }
+        
+    except BadRequestError as e:
+        return {
+            'statusCode': 400,
+            'headers': cors_headers,
             'body': json.dumps({
-                'prediction': threat_detected,
-                'confidence': round(confidence, 4),
-                'status': 'Attack Detected' if threat_detected else 'Normal Traffic',
-                'raw_score': round(prediction, 4)
+                'error': str(e),
+                'message': 'Invalid prediction request'
             })
         }
         
     except Exception as e:
         return {
             'statusCode': 500,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Headers': 'Content-Type',
-                'Access-Control-Allow-Methods': 'POST, OPTIONS'
-            },
+            'headers': cors_headers,
             'body': json.dumps({
                 'error': str(e),
                 'message': 'Error processing prediction request'
@@ -252,6 +252,7 @@ resource "aws_lambda_function" "predict" {
   environment {
     variables = {
       ENDPOINT_NAME = "threat-detection-endpoint"
+      NUM_FEATURES  = tostring(var.num_features)
     }
   }
 }
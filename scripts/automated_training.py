@@ -10,37 +10,37 @@ import json
 import os
 import sys
 import time
-from io import StringIO
+from io import BytesIO, StringIO
 
 def create_sample_data(bucket, s3_client):
     """Create sample training data if none exists"""
     print("📊 Creating sample training data...")
     
-    # Generate synthetic NSL-KDD-like data
-    np.random.seed(42)
+    # Generate synthetic NSL-KDD-like data from a single reusable generator
+    rng = np.random.default_rng(42)
     n_samples = 1000
     
     data = {
-        'duration': np.random.exponential(1, n_samples),
-        'protocol_type': np.random.choice([0, 1, 2], n_samples),
-        'service': np.random.choice([0, 1, 2, 3, 4], n_samples),
-        'flag': np.random.choice([0, 1, 2, 3], n_samples),
-        'src_bytes': np.random.exponential(100, n_samples),
-        'dst_bytes': np.random.exponential(1000, n_samples),
-        'land': np.random.choice([0, 1], n_samples, p=[0.9, 0.1]),
-        'wrong_fragment': np.random.poisson(0.1, n_samples),
-        'urgent': np.random.poisson(0.05, n_samples),
-        'hot': np.random.poisson(0.2, n_samples)
+        'duration': rng.exponential(1, n_samples),
+        'protocol_type': rng.choice([0, 1, 2], n_samples),
+        'service': rng.choice([0, 1, 2, 3, 4], n_samples),
+        'flag': rng.choice([0, 1, 2, 3], n_samples),
+        'src_bytes': rng.exponential(100, n_samples),
+        'dst_bytes': rng.exponential(1000, n_samples),
+        'land': rng.choice([0, 1], n_samples, p=[0.9, 0.1]),
+        'wrong_fragment': rng.poisson(0.1, n_samples),
+        'urgent': rng.poisson(0.05, n_samples),
+        'hot': rng.poisson(0.2, n_samples)
     }
     
-    # Add more features to reach 41 total
-    for i in range(31):
-        data[f'feature_{i}'] = np.random.normal(0, 1, n_samples)
+    # Add more features to reach 41 total, drawn as one contiguous block
+    extra = rng.standard_normal((n_samples, 31), dtype=np.float32)
+    extra_df = pd.DataFrame(extra, columns=[f'feature_{i}' for i in range(31)])
     
     # Create target (0=normal, 1=attack)
-    data['label'] = np.random.choice([0, 1], n_samples, p=[0.7, 0.3])
+    label = pd.Series(rng.choice([0, 1], n_samples, p=[0.7, 0.3]), name='label')
     
-    df = pd.DataFrame(data)
+    df = pd.concat([pd.DataFrame(data), extra_df, label], axis=1)
     
     # Split data
     train_df, val_df = train_test_split(df, test_size=0.2, random_state=42)
@@ -54,6 +54,76 @@ def create_sample_data(bucket, s3_client):
     
     print("✅ Sample data created and uploaded")
 
+def export_lambda_model(model_data, endpoint_name, s3_client):
+    """Flatten the trained XGBoost trees into JSON for in-process Lambda inference"""
+    try:
+        import xgboost as xgb
+    except ImportError:
+        print("⚠️ xgboost not installed locally (see requirements.txt), Lambda will keep using the endpoint")
+        return None
+    
+    import tarfile
+    
+    # Download model.tar.gz produced by the training job and read only the model member,
+    # so nothing from the archive is written to disk
+    bucket, key = model_data.replace('s3://', '').split('/', 1)
+    archive = s3_client.get_object(Bucket=bucket, Key=key)['Body'].read()
+    
+    with tarfile.open(fileobj=BytesIO(archive), mode='r:gz') as tar:
+        raw_model = tar.extractfile('xgboost-model').read()
+    
+    # The 1.7-1 container saves XGBoost's binary format, readable by xgboost < 3.1
+    booster = xgb.Booster()
+    booster.load_model(bytearray(raw_model))
+    
+    config = json.loads(booster.save_config())
+    base_score = float(config['learner']['learner_model_param']['base_score'].strip('[]'))
+    
+    # Store each tree as parallel arrays indexed by node id; leaves have left == -1
+    trees = []
+    for dump in booster.get_dump(dump_format='json'):
+        nodes = {}
+        stack = [json.loads(dump)]
+        while stack:
+            node = stack.pop()
+            nodes[node['nodeid']] = node
+            stack.extend(node.get('children', []))
+        
+        size = max(nodes) + 1
+        tree = {'feature': [0] * size, 'threshold': [0.0] * size, 'left': [-1] * size,
+                'right': [-1] * size, 'missing': [-1] * size, 'value': [0.0] * size}
+        for node_id, node in nodes.items():
+            if 'leaf' in node:
+                tree['value'][node_id] = node['leaf']
+            else:
+                tree['feature'][node_id] = int(node['split'].lstrip('f'))
+                tree['threshold'][node_id] = node['split_condition']
+                tree['left'][node_id] = node['yes']
+                tree['right'][node_id] = node['no']
+                tree['missing'][node_id] = node['missing']
+        trees.append(tree)
+    
+    # endpoint_name ties the trees to the deployment they came from; the Lambda only
+    # scores locally while ENDPOINT_NAME still points at that deployment
+    return {
+        'endpoint_name': endpoint_name,
+        'model_data': model_data,
+        'num_feature': booster.num_features(),
+        'base_score': base_score,
+        'trees': trees
+    }
+
+def build_lambda_package(lambda_model):
+    """Zip predict.py together with the exported model for update_function_code"""
+    import zipfile
+    
+    predict_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lambda', 'predict.py')
+    package = BytesIO()
+    with zipfile.ZipFile(package, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.write(predict_path, 'predict.py')
+        zf.writestr('xgboost_model.json', json.dumps(lambda_model))
+    return package.getvalue()
+
 def main():
     try:
         print("🚀 Starting bulletproof automated training...")
@@ -104,7 +174,7 @@ def main():
         
         # Get XGBoost container
         try:
-            container = sagemaker.image_uris.retrieve('xgboost', region, version='1.5-1')
+            container = sagemaker.image_uris.retrieve('xgboost', region, version='1.7-1')
         except Exception as e:
             print(f"❌ Error getting XGBoost container: {e}")
             sys.exit(1)
@@ -121,10 +191,13 @@ def main():
                 sagemaker_session=sess,
                 hyperparameters={
                     'objective': 'binary:logistic',
+                    'tree_method': 'hist',
+                    'max_bin': 256,
                     'eval_metric': 'auc',
-                    'num_round': 50,  # Reduced rounds
-                    'max_depth': 4,   # Reduced depth
-                    'eta': 0.1
+                    'num_round': 200,  # Upper bound; early stopping ends training sooner
+                    'max_depth': 6,
+                    'eta': 0.3,
+                    'early_stopping_rounds': 15
                 }
             )
         except Exception as e:
@@ -136,8 +209,8 @@ def main():
         try:
             from sagemaker.inputs import TrainingInput
             xgb_estimator.fit({
-                'train': TrainingInput(train_path, content_type='text/csv'),
-                'validation': TrainingInput(validation_path, content_type='text/csv')
+                'train': TrainingInput(train_path, content_type='text/csv', input_mode='FastFile'),
+                'validation': TrainingInput(validation_path, content_type='text/csv', input_mode='FastFile')
             }, wait=True)
         except Exception as e:
             print(f"❌ Training failed: {e}")
@@ -162,9 +235,14 @@ def main():
         print(f"🚀 Deploying endpoint: {endpoint_name}")
         
         try:
+            from sagemaker.serverless import ServerlessInferenceConfig
+            serverless_config = {'memory_size_in_mb': 1024, 'max_concurrency': 5}
+            provisioned = int(os.environ.get('PROVISIONED_CONCURRENCY', '0'))
+            if provisioned > 0:
+                serverless_config['provisioned_concurrency'] = provisioned  # Billed around the clock
+                print(f"🔥 Keeping {provisioned} serverless instance(s) warm")
             predictor = xgb_estimator.deploy(
-                initial_instance_count=1,
-                instance_type='ml.t2.medium',
+                serverless_inference_config=ServerlessInferenceConfig(**serverless_config),
                 endpoint_name=endpoint_name,
                 wait=True
             )
@@ -172,21 +250,46 @@ def main():
             print(f"❌ Deployment failed: {e}")
             sys.exit(1)
         
-        # Update Lambda environment variable
+        # Export the trees so Lambda can score in-process without the endpoint round-trip
+        lambda_model = None
+        try:
+            lambda_model = export_lambda_model(xgb_estimator.model_data, endpoint_name, s3_client)
+        except Exception as e:
+            print(f"⚠️ Warning exporting model for Lambda: {e}")
+        
+        # Update Lambda environment variable (and bundle the local model when available)
         try:
             lambda_client = boto3.client('lambda')
             functions = lambda_client.list_functions()['Functions']
             
+            # Feature count written by preprocess_data.py, if the real dataset was processed
+            try:
+                feature_info = json.loads(
+                    s3_client.get_object(Bucket=bucket, Key='feature_info.json')['Body'].read()
+                )
+            except Exception:
+                feature_info = None
+            
             for func in functions:
                 if 'threat-detection-predict' in func['FunctionName']:
+                    # Keep existing variables (e.g. NUM_FEATURES); this call replaces the whole set
+                    variables = func.get('Environment', {}).get('Variables', {})
+                    variables['ENDPOINT_NAME'] = endpoint_name
+                    if lambda_model:
+                        variables['NUM_FEATURES'] = str(lambda_model['num_feature'])
+                    elif feature_info:
+                        variables['NUM_FEATURES'] = str(feature_info['num_features'])
                     lambda_client.update_function_configuration(
                         FunctionName=func['FunctionName'],
-                        Environment={
-                            'Variables': {
-                                'ENDPOINT_NAME': endpoint_name
-                            }
-                        }
+                        Environment={'Variables': variables}
                     )
+                    if lambda_model:
+                        lambda_client.get_waiter('function_updated').wait(FunctionName=func['FunctionName'])
+                        lambda_client.update_function_code(
+                            FunctionName=func['FunctionName'],
+                            ZipFile=build_lambda_package(lambda_model)
+                        )
+                        print("✅ Bundled local XGBoost model into Lambda package")
                     print(f"✅ Updated Lambda function: {func['FunctionName']}")
                     break
         except Exception as e:
@@ -20,6 +20,21 @@ print_success() { echo -e "${GREEN}[SUCCESS]${NC} $1"; }
 print_warning() { echo -e "${YELLOW}[WARNING]${NC} $1"; }
 print_error() { echo -e "${RED}[ERROR]${NC} $1"; }
 
+# Point the Lambda at an endpoint while keeping its other environment variables (e.g. NUM_FEATURES)
+update_lambda_endpoint() {
+    local lambda_name=$1
+    local endpoint=$2
+    local environment
+    
+    environment=$(aws lambda get-function-configuration --function-name "$lambda_name" \
+      --query 'Environment.Variables' --output json | \
+      python3 -c "import json, sys; v = json.load(sys.stdin) or {}; v['ENDPOINT_NAME'] = sys.argv[1]; print(json.dumps({'Variables': v}))" "$endpoint")
+    
+    aws lambda update-function-configuration \
+      --function-name "$lambda_name" \
+      --environment "$environment"
+}
+
 # Step 1: Deploy Infrastructure
 deploy_infrastructure() {
     print_status "Step 1: Deploying AWS infrastructure..."
@@ -66,9 +81,7 @@ deploy_frontend() {
     CURRENT_ENDPOINT=$(aws sagemaker list-endpoints --name-contains "threat-detection-endpoint" --query 'Endpoints[0].EndpointName' --output text 2>/dev/null || echo "")
     if [ -n "$CURRENT_ENDPOINT" ] && [ "$CURRENT_ENDPOINT" != "None" ]; then
         LAMBDA_NAME=$(terraform output -raw lambda_function_name)
-        aws lambda update-function-configuration \
-          --function-name $LAMBDA_NAME \
-          --environment Variables="{ENDPOINT_NAME=$CURRENT_ENDPOINT}" 2>/dev/null || true
+        update_lambda_endpoint "$LAMBDA_NAME" "$CURRENT_ENDPOINT" >/dev/null 2>&1 || true
         print_status "Lambda configured with endpoint: $CURRENT_ENDPOINT"
     fi
     
@@ -91,9 +104,7 @@ deploy_frontend() {
     CURRENT_ENDPOINT=$(aws sagemaker list-endpoints --name-contains "threat-detection-endpoint" --query 'Endpoints[0].EndpointName' --output text)
     if [ "$CURRENT_ENDPOINT" != "None" ] && [ "$CURRENT_ENDPOINT" != "" ]; then
         LAMBDA_NAME=$(terraform output -raw lambda_function_name)
-        aws lambda update-function-configuration \
-          --function-name $LAMBDA_NAME \
-          --environment Variables="{ENDPOINT_NAME=$CURRENT_ENDPOINT}"
+        update_lambda_endpoint "$LAMBDA_NAME" "$CURRENT_ENDPOINT"
         print_success "Lambda updated with endpoint: $CURRENT_ENDPOINT"
     fi
     
@@ -107,7 +118,7 @@ deploy_frontend() {
     API_URL=$(terraform output -raw api_gateway_url)
     TEST_RESPONSE=$(curl -s -X POST "$API_URL/predict" \
       -H "Content-Type: application/json" \
-      -d '{"features": [0, 0.1, 0, 0, 0.0181, 0.545, 0.1, 0.2, 0.3, 0.4]}' \
+      -d '{"features": [0, 0.1, 0, 0, 0.0181, 0.545, 0.1, 0.2, 0.3, 0.4, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]}' \
       --max-time 15)
     
     if echo "$TEST_RESPONSE" | grep -q "prediction"; then
@@ -75,6 +75,7 @@ create_training_notebook() {
     "import boto3\n",
     "from sagemaker.xgboost.estimator import XGBoost\n",
     "from sagemaker.inputs import TrainingInput\n",
+    "from sagemaker.serverless import ServerlessInferenceConfig\n",
     "from sagemaker.serializers import CSVSerializer\n",
     "from sagemaker.deserializers import CSVDeserializer\n",
     "import os"
@@ -122,7 +123,7 @@ create_training_notebook() {
    "outputs": [],
    "source": [
     "# Get XGBoost container\n",
-    "container = sagemaker.image_uris.retrieve('xgboost', region, version='1.5-1')\n",
+    "container = sagemaker.image_uris.retrieve('xgboost', region, version='1.7-1')\n",
     "print(f\"XGBoost container: {container}\")"
    ]
   },
@@ -186,12 +187,14 @@ create_training_notebook() {
    "metadata": {},
    "outputs": [],
    "source": [
-    "# Deploy model to endpoint\n",
-    "print(\"Deploying model to endpoint...\")\n",
+    "# Deploy model to a serverless endpoint\n",
+    "print(\"Deploying model to serverless endpoint...\")\n",
     "\n",
     "predictor = xgb_estimator.deploy(\n",
-    "    initial_instance_count=1,\n",
-    "    instance_type='ml.t2.medium',\n",
+    "    serverless_inference_config=ServerlessInferenceConfig(\n",
+    "        memory_size_in_mb=1024,\n",
+    "        max_concurrency=5\n",
+    "    ),\n",
     "    endpoint_name='threat-detection-endpoint',\n",
     "    serializer=CSVSerializer(),\n",
     "    deserializer=CSVDeserializer()\n",
@@ -237,7 +240,7 @@ create_training_notebook() {
     "endpoint_info = {\n",
     "    'endpoint_name': predictor.endpoint_name,\n",
 
-    "    'instance_type': 'ml.t2.medium',\n",
+    "    'instance_type': 'serverless',\n",
     "    'status': 'InService'\n",
     "}\n",
     "\n",
@@ -316,7 +319,7 @@ validation_path = f's3://{processed_bucket}/validation/'
 output_path = f's3://{processed_bucket}/model-output/'
 
 # Container
-container = sagemaker.image_uris.retrieve('xgboost', region, version='1.5-1')
+container = sagemaker.image_uris.retrieve('xgboost', region, version='1.7-1')
 
 # Estimator
 xgb_estimator = XGBoost(
@@ -328,6 +331,8 @@ xgb_estimator = XGBoost(
     sagemaker_session=sess,
     hyperparameters={
         'objective': 'binary:logistic',
+        'tree_method': 'hist',
+        'max_bin': 256,
         'eval_metric': 'auc',
         'num_round': 50,
         'max_depth': 6,
@@ -336,8 +341,8 @@ xgb_estimator = XGBoost(
 )
 
 # Training inputs
-train_input = TrainingInput(train_path, content_type='text/csv')
-validation_input = TrainingInput(validation_path, content_type='text/csv')
+train_input = TrainingInput(train_path, content_type='text/csv', input_mode='FastFile')
+validation_input = TrainingInput(validation_path, content_type='text/csv', input_mode='FastFile')
 
 # Start training
 print("Starting training job...")
@@ -15,7 +15,7 @@ validation_path = f's3://{processed_bucket}/validation/'
 output_path = f's3://{processed_bucket}/model-output/'
 
 # Container
-container = sagemaker.image_uris.retrieve('xgboost', region, version='1.5-1')
+container = sagemaker.image_uris.retrieve('xgboost', region, version='1.7-1')
 
 # Estimator
 xgb_estimator = XGBoost(
@@ -27,6 +27,8 @@ xgb_estimator = XGBoost(
     sagemaker_session=sess,
     hyperparameters={
         'objective': 'binary:logistic',
+        'tree_method': 'hist',
+        'max_bin': 256,
         'eval_metric': 'auc',
         'num_round': 50,
         'max_depth': 6,
@@ -35,8 +37,8 @@ xgb_estimator = XGBoost(
 )
 
 # Training inputs
-train_input = TrainingInput(train_path, content_type='text/csv')
-validation_input = TrainingInput(validation_path, content_type='text/csv')
+train_input = TrainingInput(train_path, content_type='text/csv', input_mode='FastFile')
+validation_input = TrainingInput(validation_path, content_type='text/csv', input_mode='FastFile')
 
 # Start training
 print("Starting training job...")
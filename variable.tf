@@ -4,5 +4,8 @@ variable "region" {
   default     = "eu-west-1"
 }
 
-
-
+variable "num_features" {
+  description = "Features per row expected by the model (num_features in feature_info.json)"
+  type        = number
+  default     = 41
+}